@@ -3,7 +3,7 @@
 
 # Developed by: Aleksandr Kireev
 # Created: 01.11.2023
-# Updated: 23.01.2025
+# Updated: 15.10.2026
 # Website: https://bespredel.name
 
 import json
@@ -424,7 +424,7 @@ def report_list(location: str = None) -> str:
     if location is None:
         abort(404, trans('Page not found'))
 
-    pagination = db_manager.get_paginated(location, r_page, per_page)
+    pagination = db_manager.get_paginated(location, r_page, per_page, exact=False)
 
     if pagination is None:
         abort(404, trans('Page not found'))
@@ -456,7 +456,7 @@ def report_show(location: str, id: int) -> str:
         'reports/show.html',
         location=location,
         counter=counter,
-        json=json
+        parts=db_manager.get_parts(rec_id=id, limit=None)
     )
 
 
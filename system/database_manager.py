@@ -3,52 +3,249 @@
 
 # Developed by: Aleksandr Kireev
 # Created: 01.11.2023
-# Updated: 20.11.2024
+# Updated: 15.10.2026
 # Website: https://bespredel.name
 
-import json
+import atexit
+import time
+from contextlib import contextmanager
 from datetime import datetime
-
-from sqlalchemy import create_engine
+from threading import Lock
+from typing import Iterator
+
+from sqlalchemy import (
+    JSON, Select, Text, cast, create_engine, func, insert, inspect, lambda_stmt, make_url, null, select, text
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.sql.lambdas import StatementLambdaElement
 
 from system.logger import Logger
 from system.models.base_model import Base
-from system.models.cvcounter import CVCounter
+from system.models.cvcounter import CVCounter, CVCounterRow
+from system.models.cvcounter_part import CVCounterPart
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(obj: any) -> str:
+        # The JSON column type expects str, orjson returns bytes
+        return orjson.dumps(obj).decode()
+except ImportError:
+    import json
+
+    _loads = json.loads
+    _dumps = json.dumps
+
+
+def _loads_column(value: str | bytes) -> any:
+    # Older versions stored empty custom fields as '', which is not valid JSON
+    return _loads(value) if value else None
+
+
+# Dialects with INSERT ... ON CONFLICT support
+_UPSERT_INSERTS: dict[str, any] = {
+    'sqlite': sqlite_insert,
+    'postgresql': postgresql_insert,
+}
+
+
+# Columns of the reports list, the JSON columns are sent as NULL and keep the CVCounterRow layout
+_LIST_COLUMNS: list[any] = [
+    null().label(column.name) if column.name in ('parts', 'custom_fields') else column
+    for column in CVCounter.__table__.columns
+]
+
+
+# Failed writes after which a batch of buffered parts is dropped
+_PART_FLUSH_RETRIES: int = 3
+
+
+# Hot statements are built through lambda_stmt, SQLAlchemy caches them by the lambda code location
+def _select_active(location: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(CVCounter).where(CVCounter.location == location, CVCounter.active == True)  # noqa: E712
+    )
+
+
+def _select_active_row(location: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(CVCounter.__table__).where(CVCounter.location == location, CVCounter.active == True)  # noqa: E712
+    )
+
+
+def _select_active_id(location: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(CVCounter.id).where(CVCounter.location == location, CVCounter.active == True)  # noqa: E712
+    )
+
+
+def _select_row_by_id(rec_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(CVCounter.__table__).where(CVCounter.id == rec_id))
+
+
+def _select_page(location: str, offset: int, limit: int, with_total: bool = False) -> Select:
+    # Offset and limit are bound parameters, every page shares one compiled statement
+    columns = [*_LIST_COLUMNS, func.count().over().label('total')] if with_total else _LIST_COLUMNS
+    return select(*columns).where(CVCounter.location == location).offset(offset).limit(limit)
 
 
 class DatabaseManager:
 
-    def __init__(self, uri: str, prefix: str = ''):
+    def __init__(self, uri: str, prefix: str = '', pool_size: int = 20, max_overflow: int = 40,
+                 pool_recycle: int = 1800, part_buffer_size: int = 1, cache_ttl: float = 0.5,
+                 count_cache_ttl: float = 60):
         """
         Database manager using SQLAlchemy.
 
         Args:
             uri (str): Database connection URL.
             prefix (str, optional): Table prefix. Defaults to ''.
+            pool_size (int, optional): Connection pool size. Defaults to 20.
+            max_overflow (int, optional): Connections allowed above the pool size. Defaults to 40.
+            pool_recycle (int, optional): Seconds after which a connection is recycled. Defaults to 1800.
+            part_buffer_size (int, optional): Parts buffered before they are written in one batch,
+                1 writes every part immediately. Defaults to 1.
+            cache_ttl (float, optional): Seconds the current counter of a location is cached. Defaults to 0.5.
+            count_cache_ttl (float, optional): Seconds an inexact record total of a location is reused. Defaults to 60.
         """
         self.__logger: Logger = Logger()
+        self.__part_buffer: list[dict] = []
+        self.__part_buffer_size: int = part_buffer_size
+        # Batches that failed to write, with their number of failed attempts
+        self.__part_retries: list[tuple[list[dict], int]] = []
+        self.__part_lock: Lock = Lock()
+        self.__cache: dict[str, tuple[float, CVCounterRow | None]] = {}
+        # Bumped on every invalidation, a read that overlaps a write does not store its result
+        self.__cache_versions: dict[str, int] = {}
+        self.__cache_generation: int = 0
+        self.__cache_lock: Lock = Lock()
+        self.__cache_ttl: float = cache_ttl
+        self.__count_cache: dict[str, tuple[float, int]] = {}
+        self.__count_cache_ttl: float = count_cache_ttl
+        self.__upsert_insert: any = None
+        atexit.register(self.flush)
         try:
-            self.__engine: any = create_engine(uri)
+            engine_options = {'pool_pre_ping': True}
+            if make_url(uri).get_backend_name() != 'sqlite':
+                # SQLite uses its own pools, the sizing options do not apply
+                engine_options.update(pool_size=pool_size, max_overflow=max_overflow, pool_recycle=pool_recycle)
+
+            # JSON columns are encoded and decoded by the engine
+            self.__engine: any = create_engine(uri, json_serializer=_dumps, json_deserializer=_loads_column,
+                                               **engine_options)
             self.__prefix: str = prefix
-            self.__sessionmaker: any = sessionmaker(bind=self.__engine)
+            # One session per thread, loaded objects stay usable after commit
+            self.__sessionmaker: any = scoped_session(sessionmaker(bind=self.__engine, expire_on_commit=False))
 
             # Create tables if they don't exist yet
             Base.metadata.create_all(self.__engine)
+
+            self.__migrate_json_columns()
+
+            # Indexes added later are not created by create_all for existing tables
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    try:
+                        index.create(self.__engine, checkfirst=True)
+                    except SQLAlchemyError as error:
+                        # For example several active counters of one location in an old database
+                        self.__logger.warning(f"Index '{index.name}' was not created: {error}")
+
+            # The upsert needs the unique index on active counters as its conflict target
+            dialect = self.__engine.dialect.name
+            indexes = {index['name'] for index in inspect(self.__engine).get_indexes(CVCounter.__tablename__)}
+            if dialect in _UPSERT_INSERTS and f'ux_{CVCounter.__tablename__}_location_active' in indexes:
+                self.__upsert_insert = _UPSERT_INSERTS[dialect]
+
+            self.__warm_up()
         except SQLAlchemyError as error:
             self.__logger.error(str(error))
             self.__logger.log_exception()
 
+    def __migrate_json_columns(self) -> None:
+        """
+        Converts the TEXT custom_fields and parts columns of tables created by older versions to the JSON types.
+        Only needed on PostgreSQL, psycopg2 decodes json and jsonb columns but returns TEXT as is.
+        Other databases keep TEXT, the JSON type decodes it on read.
+
+        Returns:
+            None
+        """
+        dialect = self.__engine.dialect
+        if dialect.name != 'postgresql':
+            return
+
+        table = CVCounter.__table__
+        existing = {column['name']: column['type'] for column in inspect(self.__engine).get_columns(table.name)}
+        preparer = dialect.identifier_preparer
+        with self.__engine.begin() as connection:
+            for column in (table.c.custom_fields, table.c.parts):
+                if isinstance(existing.get(column.name), JSON):
+                    continue
+                # Older versions also stored empty custom fields as '', which is not valid JSON
+                name = preparer.quote(column.name)
+                type_name = column.type.compile(dialect=dialect)
+                connection.execute(text(
+                    f"ALTER TABLE {preparer.format_table(table)} ALTER COLUMN {name} "
+                    f"TYPE {type_name} USING NULLIF({name}, '')::{type_name}"
+                ))
+
+    def __warm_up(self) -> None:
+        """
+        Runs the hot read statements once, so they are compiled and cached before the first request.
+
+        Returns:
+            None
+        """
+        statements = (
+            _select_active(''),
+            _select_active_row(''),
+            _select_active_id(''),
+            _select_row_by_id(0),
+            _select_page('', 0, 1),
+            _select_page('', 0, 1, with_total=True),
+        )
+        try:
+            with self._scope() as session:
+                for statement in statements:
+                    session.execute(statement).all()
+        except SQLAlchemyError as error:
+            # Not fatal, the statements are compiled on first use instead
+            self.__logger.warning(f"Statement warm-up failed: {str(error)}")
+
     def create_session(self) -> any:
         """
-        Creates and returns a new session.
+        Returns the session of the current thread.
 
         Returns:
-            Session: A new session.
+            Session: The thread-local session.
         """
         return self.__sessionmaker()
 
+    @contextmanager
+    def _scope(self) -> Iterator[any]:
+        """
+        Provides a session that is committed on success, rolled back on error and closed afterwards.
+        Errors are re-raised, logging them is left to the caller.
+
+        Returns:
+            Iterator[Session]: The session.
+        """
+        session = self.create_session()
+        try:
+            yield session
+            session.commit()
+        except SQLAlchemyError:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
     def save_result(self, location: str, total_count: int = 0, source_count: int = 0, defects_count: int = 0,
                     correct_count: int = 0, custom_fields: str = '', active: bool = True) -> bool:
         """
@@ -66,59 +263,142 @@ class DatabaseManager:
         Returns:
             bool: True if the result was saved successfully, False otherwise.
         """
-        session = self.create_session()
+        # Empty custom fields need no parsing and nothing to merge
+        new_custom_fields = None
+        if custom_fields and custom_fields not in ('{}', '""'):
+            new_custom_fields = _loads(custom_fields)
+
+        if active and self.__upsert_insert is not None:
+            return self.__upsert_result(location, total_count, source_count, defects_count, correct_count,
+                                        new_custom_fields)
+
+        now = datetime.now()
+        inserted = True
         try:
-            result = session.query(CVCounter).filter_by(location=location, active=True).first()
-
-            new_custom_fields = {}
-            if custom_fields:
-                new_custom_fields = json.loads(custom_fields if custom_fields else '{}')
-
-            if result:
-                # Обновляем существующие custom_fields
-                existing_custom_fields = json.loads(result.custom_fields if result.custom_fields else '{}')
-                if new_custom_fields:
-                    # Объединение нового и существующего словаря
-                    existing_custom_fields.update(new_custom_fields)
-                    custom_fields = json.dumps(existing_custom_fields)
-
-            if result:
-                # Обновляем существующую запись
-                result.active = active
-                result.total_count = total_count
-                result.source_count = source_count
-                result.defects_count = defects_count
-                result.correct_count = correct_count
-                result.custom_fields = custom_fields
-                result.updated_at = datetime.now()
+            with self._scope() as session:
+                result = session.execute(_select_active(location)).scalars().first()
+
+                custom_fields = new_custom_fields
+                if result and new_custom_fields:
+                    # Объединение нового и существующего словаря custom_fields
+                    custom_fields = {**(result.custom_fields or {}), **new_custom_fields}
+
+                if result:
+                    # Обновляем существующую запись
+                    inserted = False
+                    result.active = active
+                    result.total_count = total_count
+                    result.source_count = source_count
+                    result.defects_count = defects_count
+                    result.correct_count = correct_count
+                    result.custom_fields = custom_fields
+                    result.updated_at = now
+                else:
+                    # Вставляем новую запись
+                    new_result = CVCounter(
+                        active=active,
+                        location=location,
+                        total_count=total_count,
+                        source_count=source_count,
+                        defects_count=defects_count,
+                        correct_count=correct_count,
+                        custom_fields=custom_fields,
+                        created_at=now,
+                        updated_at=now
+                    )
+                    session.add(new_result)
+            return True
+        except SQLAlchemyError as error:
+            self.__logger.error(str(error))
+            self.__logger.log_exception()
+            return False
+        finally:
+            self.__invalidate_cache(location)
+            if inserted:
+                # Only a new counter changes the total of the location
+                self.__count_cache.pop(location, None)
+
+    def __upsert_result(self, location: str, total_count: int, source_count: int, defects_count: int,
+                        correct_count: int, custom_fields: dict | None) -> bool:
+        """
+        Inserts or updates the active counter of a location in a single statement.
+
+        Args:
+            location (str): The location of the result.
+            total_count (int): The total count.
+            source_count (int): The source count.
+            defects_count (int): The defects count.
+            correct_count (int): The correct count.
+            custom_fields (dict | None): The custom fields, merged into the existing ones.
+
+        Returns:
+            bool: True if the result was saved successfully, False otherwise.
+        """
+        now = datetime.now()
+        stmt = self.__upsert_insert(CVCounter).values(
+            active=True,
+            location=location,
+            total_count=total_count,
+            source_count=source_count,
+            defects_count=defects_count,
+            correct_count=correct_count,
+            custom_fields=custom_fields,
+            created_at=now,
+            updated_at=now
+        )
+
+        new_custom_fields = stmt.excluded.custom_fields
+        if custom_fields:
+            # The merge happens on the database side
+            if self.__engine.dialect.name == 'postgresql':
+                new_custom_fields = func.coalesce(
+                    cast(CVCounter.custom_fields, JSONB), func.jsonb_build_object()
+                ).op('||')(cast(stmt.excluded.custom_fields, JSONB))
             else:
-                # Вставляем новую запись
-                new_result = CVCounter(
-                    active=active,
-                    location=location,
-                    total_count=total_count,
-                    source_count=source_count,
-                    defects_count=defects_count,
-                    correct_count=correct_count,
-                    custom_fields=custom_fields,
-                    created_at=datetime.now(),
-                    updated_at=datetime.now()
+                # TEXT columns of older versions may still hold ''
+                existing_custom_fields = func.nullif(cast(CVCounter.custom_fields, Text), '')
+                new_custom_fields = func.json_patch(
+                    func.coalesce(existing_custom_fields, func.json_object()), stmt.excluded.custom_fields
                 )
-                session.add(new_result)
-            session.commit()
+
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CVCounter.location],
+            index_where=CVCounter.active == True,  # noqa: E712
+            set_={
+                'total_count': stmt.excluded.total_count,
+                'source_count': stmt.excluded.source_count,
+                'defects_count': stmt.excluded.defects_count,
+                'correct_count': stmt.excluded.correct_count,
+                'custom_fields': new_custom_fields,
+                'updated_at': now
+            }
+        )
+        if self.__engine.dialect.insert_returning:
+            # An update keeps the creation time of the existing counter
+            stmt = stmt.returning(CVCounter.created_at)
+
+        inserted = True
+        try:
+            with self._scope() as session:
+                created_at = session.execute(stmt).scalar()
+                if created_at is not None and created_at != now:
+                    inserted = False
             return True
         except SQLAlchemyError as error:
-            session.rollback()
             self.__logger.error(str(error))
             self.__logger.log_exception()
             return False
         finally:
-            session.close()
+            self.__invalidate_cache(location)
+            if inserted:
+                # Only a new counter changes the total of the location
+                self.__count_cache.pop(location, None)
 
     def save_part_result(self, location: str, current_count: int = 0, total_count: int = 0, defects_count: int = 0,
                          correct_count: int = 0) -> bool:
         """
         Saves a part result to the database.
+        With a part buffer larger than 1 parts are written in batches, see flush().
 
         Args:
             location (str): The location of the result.
@@ -130,32 +410,153 @@ class DatabaseManager:
         Returns:
             bool: True if the result was saved successfully, False otherwise.
         """
-        session = self.create_session()
         try:
-            result = session.query(CVCounter).filter_by(location=location, active=True).first()
-            if result:
-                # Update the parts field
-                parts = json.loads(result.parts) if result.parts else []
-                parts.append({
-                    'current': current_count,
-                    'total': total_count,
-                    'defects': defects_count,
-                    'correct': correct_count,
-                    'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-                parts = sorted(parts, key=lambda x: x['created_at'], reverse=True)
-                result.parts = json.dumps(parts)
-                result.updated_at = datetime.now()
-                session.commit()
-                return True
+            with self._scope() as session:
+                counter_id = session.execute(_select_active_id(location)).scalar()
+        except SQLAlchemyError as error:
+            self.__logger.error(str(error))
+            self.__logger.log_exception()
+            return False
+
+        if counter_id is None:
             return False
+
+        part = {
+            'cvcounter_id': counter_id,
+            'current': current_count,
+            'total': total_count,
+            'defects': defects_count,
+            'correct': correct_count,
+            'created_at': datetime.now()
+        }
+        if self.__part_buffer_size <= 1:
+            # Written right away, a part that failed is reported and not retried
+            return self.__write_parts([part])
+
+        with self.__part_lock:
+            self.__part_buffer.append(part)
+            buffer_full = len(self.__part_buffer) >= self.__part_buffer_size
+
+        return self.flush() if buffer_full else True
+
+    def flush(self) -> bool:
+        """
+        Writes the buffered parts to the database.
+        Batches that failed before are retried on their own, a batch is dropped after 3 failed attempts.
+
+        Returns:
+            bool: True if the parts were written successfully, False otherwise.
+        """
+        with self.__part_lock:
+            parts, self.__part_buffer = self.__part_buffer, []
+            retries, self.__part_retries = self.__part_retries, []
+
+        # Retried separately, so a batch that cannot be written does not take newer parts down with it
+        retried = True
+        for batch, failures in retries:
+            if not self.__write_parts(batch):
+                retried = False
+                self.__retry_parts(batch, failures + 1)
+
+        if not parts:
+            return retried
+        if self.__write_parts(parts):
+            return True
+        self.__retry_parts(parts, 1)
+        return False
+
+    def __write_parts(self, parts: list[dict]) -> bool:
+        """
+        Inserts parts and updates the update time of their counters.
+
+        Args:
+            parts (list[dict]): The parts.
+
+        Returns:
+            bool: True if the parts were written successfully, False otherwise.
+        """
+        # Parts are buffered in order, so the last one of every counter sets its update time
+        updated = {part['cvcounter_id']: part['created_at'] for part in parts}
+
+        try:
+            with self._scope() as session:
+                session.execute(insert(CVCounterPart), parts)
+                for counter_id, updated_at in updated.items():
+                    session.query(CVCounter).filter_by(id=counter_id).update(
+                        {CVCounter.updated_at: updated_at},
+                        synchronize_session=False
+                    )
+            # Cached counters are keyed by location, not id
+            self.__invalidate_cache()
+            return True
         except SQLAlchemyError as error:
-            session.rollback()
             self.__logger.error(str(error))
             self.__logger.log_exception()
             return False
-        finally:
-            session.close()
+
+    def __retry_parts(self, parts: list[dict], failures: int) -> None:
+        """
+        Keeps a batch of parts that failed to write for the next flush, or drops it after too many failures.
+
+        Args:
+            parts (list[dict]): The parts.
+            failures (int): The number of failed attempts so far.
+
+        Returns:
+            None
+        """
+        if failures >= _PART_FLUSH_RETRIES:
+            self.__logger.error(f"{len(parts)} part result(s) dropped after {_PART_FLUSH_RETRIES} failed writes")
+            return
+
+        with self.__part_lock:
+            self.__part_retries.append((parts, failures))
+
+    def get_parts(self, location: str = '', rec_id: int | None = None, limit: int | None = 50) -> list[dict]:
+        """
+        Returns the parts of a counter, newest first.
+
+        Args:
+            location (str, optional): The location of the active counter. Defaults to ''.
+            rec_id (int | None, optional): The counter id, takes precedence over the location. Defaults to None.
+            limit (int | None, optional): The maximum number of parts, None for all. Defaults to 50.
+
+        Returns:
+            list[dict]: The parts.
+        """
+        self.flush()
+        try:
+            with self._scope() as session:
+                query = session.query(CVCounter.id, CVCounter.parts)
+                if rec_id is None:
+                    counter = query.filter_by(location=location, active=True).first()
+                else:
+                    counter = query.filter_by(id=rec_id).first()
+                if counter is None:
+                    return []
+
+                results = session.query(CVCounterPart).filter_by(cvcounter_id=counter.id).order_by(
+                    CVCounterPart.created_at.desc(), CVCounterPart.id.desc()
+                ).limit(limit).all()
+        except SQLAlchemyError as error:
+            self.__logger.error(str(error))
+            return []
+
+        parts = [{
+            'current': part.current,
+            'total': part.total,
+            'defects': part.defects,
+            'correct': part.correct,
+            # Same format as strftime("%Y-%m-%d %H:%M:%S"), without parsing a format string
+            'created_at': part.created_at.isoformat(sep=' ', timespec='seconds') if part.created_at else None
+        } for part in results]
+
+        if counter.parts:
+            # Parts saved before the parts table stay in the legacy column, both lists share the time format
+            parts.extend(counter.parts)
+            parts.sort(key=lambda part: part.get('created_at') or '', reverse=True)
+
+        return parts[:limit]
 
     def close_current_count(self, location: str) -> bool:
         """
@@ -167,23 +568,22 @@ class DatabaseManager:
         Returns:
             bool: True if the counter was closed successfully, False otherwise.
         """
-        session = self.create_session()
+        self.flush()
         try:
-            result = session.query(CVCounter).filter_by(location=location, active=True).first()
-            if result:
-                result.active = False
-                result.updated_at = datetime.now()
-                session.commit()
-                return True
-            return False
+            with self._scope() as session:
+                # Single UPDATE without loading the record
+                rows = session.query(CVCounter).filter_by(location=location, active=True).update(
+                    {CVCounter.active: False, CVCounter.updated_at: datetime.now()},
+                    synchronize_session=False
+                )
+            return rows > 0
         except SQLAlchemyError as error:
-            session.rollback()
             self.__logger.error(str(error))
             return False
         finally:
-            session.close()
+            self.__invalidate_cache(location)
 
-    def get_current_count(self, key: str = '') -> CVCounter | None:
+    def get_current_count(self, key: str = '') -> CVCounterRow | None:
         """
         Returns the current counter for the given key.
 
@@ -191,19 +591,47 @@ class DatabaseManager:
             key (str, optional): The key. Defaults to ''.
 
         Returns:
-            CVCounter: The current counter.
+            CVCounterRow: The current counter.
         """
-        session = self.create_session()
+        with self.__cache_lock:
+            cached = self.__cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.__cache_ttl:
+                return cached[1]
+            version = (self.__cache_generation, self.__cache_versions.get(key, 0))
+
         try:
-            result = session.query(CVCounter).filter_by(active=True, location=key).first()
-            return result if result else None
+            with self._scope() as session:
+                row = session.execute(_select_active_row(key)).first()
         except SQLAlchemyError as error:
             self.__logger.error(str(error))
             return None
-        finally:
-            session.close()
 
-    def get_count(self, rec_id: int) -> CVCounter | None:
+        result = CVCounterRow(*row) if row else None
+        with self.__cache_lock:
+            # A write committed during the query may have made the row stale
+            if version == (self.__cache_generation, self.__cache_versions.get(key, 0)):
+                self.__cache[key] = (time.monotonic(), result)
+        return result
+
+    def __invalidate_cache(self, location: str | None = None) -> None:
+        """
+        Drops the cached current counter of a location, or of all locations.
+
+        Args:
+            location (str | None, optional): The location, None for all. Defaults to None.
+
+        Returns:
+            None
+        """
+        with self.__cache_lock:
+            if location is None:
+                self.__cache_generation += 1
+                self.__cache.clear()
+            else:
+                self.__cache_versions[location] = self.__cache_versions.get(location, 0) + 1
+                self.__cache.pop(location, None)
+
+    def get_count(self, rec_id: int) -> CVCounterRow | None:
         """
         Returns the count for the given id.
 
@@ -211,19 +639,35 @@ class DatabaseManager:
             rec_id (int): The record id.
 
         Returns:
-            CVCounter: The count.
+            CVCounterRow: The count.
         """
-        session = self.create_session()
         try:
-            result = session.query(CVCounter).filter_by(id=rec_id).first()
-            return result if result else None
+            with self._scope() as session:
+                row = session.execute(_select_row_by_id(rec_id)).first()
         except SQLAlchemyError as error:
             self.__logger.error(str(error))
             return None
-        finally:
-            session.close()
 
-    def get_paginated(self, key: str = '', page: int = 1, per_page: int = 10) -> dict:
+        return CVCounterRow(*row) if row else None
+
+    def _estimated_count(self, key: str) -> int | None:
+        """
+        Returns the cached number of counters for the given key, if it is recent enough.
+        The cache is dropped when save_result adds a counter and expires after count_cache_ttl seconds,
+        so writes from other processes show up after at most that time.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            int | None: The number of counters or None if it is not cached.
+        """
+        cached = self.__count_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.__count_cache_ttl:
+            return cached[1]
+        return None
+
+    def get_paginated(self, key: str = '', page: int = 1, per_page: int = 10, exact: bool = True) -> dict:
         """
         Returns all counters for the given key.
 
@@ -231,26 +675,48 @@ class DatabaseManager:
             key (str, optional): The key. Defaults to ''.
             page (int, optional): The page number. Defaults to 1.
             per_page (int, optional): The number of records per page. Defaults to 10.
+            exact (bool, optional): Count the records on every call instead of reusing a cached total. Defaults to True.
 
         Returns:
-            list: A list of counters.
+            dict: The page of counters (CVCounterRow without parts and custom_fields) with pagination details.
         """
-        session = self.create_session()
+        total = None if exact else self._estimated_count(key)
+        # Only a counted total renews the cache, reusing it must not keep it from expiring
+        counted = total is None
+        offset = (page - 1) * per_page
         try:
-            query = session.query(CVCounter).filter_by(location=key)
-            total = query.count()  # Getting the total number of records
-            results = query.offset((page - 1) * per_page).limit(per_page).all()  # Applying offset and limit
-
-            return {
-                'total': total,
-                'page': page,
-                'per_page': per_page,
-                'results': results,
-                'has_next': page * per_page < total,  # Checking if there is a next page
-                'has_prev': page > 1  # Checking if there is a previous page
-            }
+            with self._scope() as session:
+                if total is not None:
+                    # The total is known, only the page is needed
+                    rows = session.execute(_select_page(key, offset, per_page)).all()
+                    results = [CVCounterRow(*row) for row in rows]
+                    if results and len(results) < per_page:
+                        # The last page gives the exact total for free
+                        total = offset + len(results)
+                        counted = True
+                else:
+                    # The page and the total number of records in a single query
+                    rows = session.execute(_select_page(key, offset, per_page, with_total=True)).all()
+
+                    if rows:
+                        total = rows[0].total
+                        results = [CVCounterRow(*row[:-1]) for row in rows]
+                    else:
+                        # An empty page carries no window total, count separately
+                        total = session.query(CVCounter).filter_by(location=key).count()
+                        results = []
         except SQLAlchemyError as error:
             self.__logger.error(f"Error retrieving counters for key '{key}': {str(error)}")
             return None  # Return None on error
-        finally:
-            session.close()
+
+        if counted:
+            self.__count_cache[key] = (time.monotonic(), total)
+
+        return {
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'results': results,
+            'has_next': page * per_page < total,  # Checking if there is a next page
+            'has_prev': page > 1  # Checking if there is a previous page
+        }
@@ -3,7 +3,7 @@
 
 # Developed by: Aleksandr Kireev
 # Created: 27.12.2024
-# Updated: 27.12.2024
+# Updated: 15.10.2026
 # Website: https://bespredel.name
 
 from config import config
@@ -12,11 +12,14 @@ from sqlalchemy.orm import declared_attr
 
 
 class TablePrefixBase:
-    __table_prefix__: str = config.get('db.prefix', '')
+    # Overrides the configured prefix when set on a model
+    __table_prefix__: str | None = None
 
     @declared_attr
     def __tablename__(cls) -> str:
-        return cls.__table_prefix__ + cls.__name__.lower()
+        # The prefix is read when each model is declared, not when this module is imported
+        prefix = cls.__table_prefix__ if cls.__table_prefix__ is not None else config.get('db.prefix', '')
+        return (prefix or '') + cls.__name__.lower()
 
 
 # Defining the base class
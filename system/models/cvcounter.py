@@ -3,17 +3,33 @@
 
 # Developed by: Aleksandr Kireev
 # Created: 27.12.2024
-# Updated: 27.12.2024
+# Updated: 15.10.2026
 # Website: https://bespredel.name
 
+from collections import namedtuple
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Integer, String, Text
+from sqlalchemy import JSON, Boolean, Column, DateTime, Index, Integer, String, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import declared_attr
 
 from system.models.base_model import Base
 
 
 class CVCounter(Base):
+    @declared_attr
+    def __table_args__(cls) -> tuple:
+        # Index names are prefixed as well, they share a namespace on some databases
+        return (
+            Index(f'ix_{cls.__tablename__}_location_active', 'location', 'active'),
+            # One active counter per location, the conflict target of the upsert in save_result.
+            # Only created where partial indexes are supported.
+            Index(
+                f'ux_{cls.__tablename__}_location_active', 'location', unique=True,
+                sqlite_where=text('active = 1'), postgresql_where=text('active')
+            ).ddl_if(dialect=('sqlite', 'postgresql')),
+        )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     active = Column(Boolean, default=True)
     location = Column(String(255), nullable=False)
@@ -21,7 +37,11 @@ class CVCounter(Base):
     source_count = Column(Integer, default=0)
     defects_count = Column(Integer, default=0)
     correct_count = Column(Integer, default=0)
-    parts = Column(Text, nullable=True)
-    custom_fields = Column(Text, nullable=True)
+    parts = Column(JSON(none_as_null=True), nullable=True)
+    custom_fields = Column(JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql'), nullable=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+# Lightweight read-only record with the same fields as CVCounter
+CVCounterRow = namedtuple('CVCounterRow', [column.name for column in CVCounter.__table__.columns])
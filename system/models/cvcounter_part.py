@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# ! python3
+
+# Developed by: Aleksandr Kireev
+# Created: 15.10.2026
+# Updated: 15.10.2026
+# Website: https://bespredel.name
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
+from sqlalchemy.orm import declared_attr
+
+from system.models.base_model import Base
+from system.models.cvcounter import CVCounter
+
+
+class CVCounterPart(Base):
+    @declared_attr
+    def __table_args__(cls) -> tuple:
+        return (
+            Index(f'ix_{cls.__tablename__}_cvcounter_id_created_at', 'cvcounter_id', 'created_at'),
+        )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cvcounter_id = Column(Integer, ForeignKey(CVCounter.id), nullable=False)
+    current = Column(Integer, default=0)
+    total = Column(Integer, default=0)
+    defects = Column(Integer, default=0)
+    correct = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.now)
@@ -3,10 +3,9 @@
 
 # Developed by: Aleksandr Kireev
 # Created: 01.11.2023
-# Updated: 22.01.2025
+# Updated: 15.10.2026
 # Website: https://bespredel.name
 
-import json
 import os
 import random
 import re
@@ -376,8 +375,7 @@ class ObjectCounter:
             'source_count': result.source_count,
             'defects_count': result.defects_count,
             'correct_count': result.correct_count,
-            'parts': json.loads(result.parts) if result.parts else [],
-            'custom_fields': json.loads(result.custom_fields) if result.custom_fields else [],
+            'custom_fields': result.custom_fields or [],
             'created_at': result.created_at.strftime("%Y-%m-%d %H:%M:%S") if result.created_at else None,
             'updated_at': result.updated_at.strftime("%Y-%m-%d %H:%M:%S") if result.updated_at else None
         }